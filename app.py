@@ -1,16 +1,24 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import os
+import json
+import hashlib
+import time
+import functools
+import itertools
+import threading
+from queue import Empty, Queue
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 import dotenv
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
-from langchain_community.vectorstores import Chroma
-from chromadb.config import Settings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
+from cachetools import LRUCache, TTLCache
+from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage
 from werkzeug.utils import secure_filename
 
+# Chroma, the embedding model (torch) and the Gemini client are imported inside
+# the functions that use them so the server starts without loading them
+
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -20,7 +28,36 @@ CORS(app)
 # ----------------------- CONFIGURATION -----------------------
 UPLOAD_FOLDER = 'Docs'
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx'}
-MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB
+_EXT_SUFFIXES = tuple('.' + ext for ext in ALLOWED_EXTENSIONS)
+# Per-type upload limits; plain text is capped lower since it turns into far
+# more chunks per byte than PDF or Word files
+MAX_FILE_SIZES = {
+    'txt': 4 * 1024 * 1024,     # 4 MB
+    'pdf': 64 * 1024 * 1024,    # 64 MB
+    'doc': 16 * 1024 * 1024,    # 16 MB
+    'docx': 16 * 1024 * 1024,   # 16 MB
+}
+MAX_CONTENT_LENGTH = max(MAX_FILE_SIZES.values())
+UPLOAD_BUFFER_SIZE = 1024 * 1024  # 1 MB
+
+# "chroma" (default) or "usearch" for a native HNSW index with sqlite storage
+INDEX_BACKEND = os.environ.get("INDEX_BACKEND", "chroma").lower()
+# Scalar type of stored usearch vectors: "f16" (2 bytes/dim) or "i8" (1 byte/dim)
+USEARCH_DTYPE = os.environ.get("USEARCH_DTYPE", "f16").lower()
+
+# HNSW index parameters for the Chroma collection. Every embedding backend
+# returns unit-length vectors, so inner product is equivalent to cosine.
+HNSW_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 128,
+    "hnsw:search_ef": 64,
+}
+
+# Concurrent questions are embedded and searched together: up to
+# QUERY_BATCH_SIZE questions arriving within QUERY_BATCH_WINDOW seconds
+QUERY_BATCH_SIZE = 32
+QUERY_BATCH_WINDOW = 0.02
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -29,16 +66,77 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 books_dir = os.path.join(current_dir, "Docs")
 db_dir = os.path.join(current_dir, "db")
 persistent_directory = os.path.join(db_dir, "chroma_db")
+collection_name = "langchain"
+usearch_directory = os.path.join(db_dir, "usearch")
+index_directory = usearch_directory if INDEX_BACKEND == "usearch" else persistent_directory
 
 os.makedirs(books_dir, exist_ok=True)
 os.makedirs(db_dir, exist_ok=True)
 
+# Process-wide handles, created on first use
+_CLIENT = None
+_DB = None
+_LLM = None
+
+# Answers keyed by (question hash, corpus version); the version is bumped on
+# every index write so stale answers are never served after an upload
+_ANSWER_CACHE = TTLCache(maxsize=2048, ttl=3600)
+_ANSWER_CACHE_LOCK = threading.Lock()  # cachetools caches are not thread-safe
+_CORPUS_VERSION = 0
+
+# Uploaded files waiting to be indexed, and the last known status per file
+_JOBS = Queue()
+_JOB_STATUS = {}
+
+# Questions waiting for retrieval, and embeddings of recently asked questions
+_QUERIES = Queue()
+_QUERY_VECTORS = LRUCache(maxsize=1024)
+
+# Prompt pieces shared by every /api/ask request
+_SYSTEM_MESSAGE = SystemMessage(content="You answer strictly from the provided documents.")
+_PROMPT_TEMPLATE = (
+    "{question}\n\nRelevant Docs:\n{context}"
+    "\n\nAnswer only using the above data. If unsure, say 'I'm not sure'."
+)
+
 # ----------------------- HELPERS -----------------------
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def save_upload(stream, file_path, max_size):
+    # Content-Length is absent on chunked uploads, so the limit is enforced on
+    # the bytes actually copied. Writing to a temporary name keeps an existing
+    # file with the same name intact if the upload is rejected.
+    part_path = file_path + ".part"
+    written = 0
+    try:
+        with open(part_path, "wb") as out:
+            while True:
+                block = stream.read(UPLOAD_BUFFER_SIZE)
+                if not block:
+                    break
+                written += len(block)
+                if written > max_size:
+                    break
+                out.write(block)
+        if written > max_size:
+            return False
+        os.replace(part_path, file_path)
+        return True
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def scan_documents():
+    with os.scandir(books_dir) as it:
+        return [e for e in it if e.is_file() and e.name.lower().endswith(_EXT_SUFFIXES)]
+
+
 def get_document_loader(file_path, file_extension):
+    from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
+
     if file_extension.lower() == 'txt':
         return TextLoader(file_path, encoding="utf-8")
     elif file_extension.lower() == 'pdf':
@@ -49,68 +147,292 @@ def get_document_loader(file_path, file_extension):
         raise ValueError(f"Unsupported file type: {file_extension}")
 
 
+@functools.lru_cache(maxsize=1)
 def get_embeddings():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    import torch
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"},
+        encode_kwargs={"batch_size": 64, "normalize_embeddings": True}
+    )
 
 
 def chroma_settings():
+    from chromadb.config import Settings
+
     return Settings(
         persist_directory=persistent_directory,
         anonymized_telemetry=False   # Disable Chroma telemetry
     )
 
 
+def get_chroma_client():
+    global _CLIENT
+    if _CLIENT is None:
+        import chromadb
+        _CLIENT = chromadb.PersistentClient(path=persistent_directory, settings=chroma_settings())
+    return _CLIENT
+
+
 def get_vector_store():
-    embeddings = get_embeddings()
-    if os.path.exists(persistent_directory):
-        return Chroma(
-            persist_directory=persistent_directory,
-            embedding_function=embeddings,
-            client_settings=chroma_settings()
+    global _DB
+    if _DB is None and os.path.exists(index_directory):
+        _DB = open_vector_store()
+    return _DB
+
+
+def open_vector_store():
+    if INDEX_BACKEND == "usearch":
+        from usearch_store import UsearchStore
+        return UsearchStore(usearch_directory, get_embeddings(), dtype=USEARCH_DTYPE)
+
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        client=get_chroma_client(),
+        collection_name=collection_name,
+        embedding_function=get_embeddings(),
+        collection_metadata=HNSW_METADATA
+    )
+
+
+def create_vector_store(docs, ids):
+    if INDEX_BACKEND == "usearch":
+        db = open_vector_store()
+        db.add_documents(docs, ids=ids)
+        return db
+
+    from langchain_community.vectorstores import Chroma
+    return Chroma.from_documents(
+        docs,
+        get_embeddings(),
+        ids=ids,
+        client=get_chroma_client(),
+        collection_name=collection_name,
+        collection_metadata=HNSW_METADATA
+    )
+
+
+def delete_source(db, source):
+    if INDEX_BACKEND == "usearch":
+        db.delete_source(source)
+    else:
+        db._collection.delete(where={"source": source})
+
+
+def query_vectors(db, vectors, n_results):
+    if INDEX_BACKEND == "usearch":
+        return db.query(vectors, n_results)
+    return db._collection.query(
+        query_embeddings=vectors,
+        n_results=n_results,
+        include=["documents", "metadatas", "embeddings"]
+    )
+
+
+def get_llm():
+    global _LLM
+    if _LLM is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        _LLM = ChatGoogleGenerativeAI(model="gemini-2.5-flash", convert_system_message_to_human=True)
+    return _LLM
+
+
+def load_document(file):
+    file_path = os.path.join(books_dir, file)
+    file_extension = file.rsplit('.', 1)[1].lower()
+
+    loader = get_document_loader(file_path, file_extension)
+    file_docs = loader.load()
+
+    for doc in file_docs:
+        doc.metadata = {"source": file, "type": file_extension}
+    return file_docs
+
+
+def _load_one(file):
+    try:
+        return load_document(file)
+    except Exception as e:
+        print(f"Error processing {file}: {e}")
+        return []
+
+
+def split_documents(documents):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    # Chunk sizes are measured in tokens, not characters
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=400,
+        chunk_overlap=40,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    return text_splitter.split_documents(documents)
+
+
+def retrieve_documents(question):
+    future = Future()
+    _QUERIES.put((question, future))
+    return future.result()
+
+
+def embed_questions(questions):
+    # HuggingFaceEmbeddings.embed_query is embed_documents on one text, so the
+    # batch call is equivalent
+    return get_embeddings().embed_documents(questions)
+
+
+def _search_batch(questions):
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+    db = get_vector_store()
+
+    # Copy cached vectors out first: inserting new ones may evict entries that
+    # this same batch still needs
+    found = {q: _QUERY_VECTORS.get(q) for q in dict.fromkeys(questions)}
+    missing = [q for q, vector in found.items() if vector is None]
+    if missing:
+        for question, vector in zip(missing, embed_questions(missing)):
+            found[question] = vector
+            _QUERY_VECTORS[question] = vector
+    vectors = [found[q] for q in questions]
+
+    results = query_vectors(db, vectors, 20)
+
+    # MMR re-ranks the 20 nearest chunks so near-duplicates don't fill the context
+    batch_docs = []
+    for i, vector in enumerate(vectors):
+        selected = maximal_marginal_relevance(
+            np.array(vector, dtype=np.float32), results["embeddings"][i], k=4, lambda_mult=0.5
         )
-    return None
+        batch_docs.append([
+            Document(page_content=results["documents"][i][j], metadata=results["metadatas"][i][j])
+            for j in selected
+        ])
+    return batch_docs
+
+
+def _query_worker():
+    while True:
+        batch = [_QUERIES.get()]
+        deadline = time.monotonic() + QUERY_BATCH_WINDOW
+        while len(batch) < QUERY_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_QUERIES.get(timeout=timeout))
+            except Empty:
+                break
+
+        try:
+            results = _search_batch([question for question, _ in batch])
+            for (_, future), docs in zip(batch, results):
+                future.set_result(docs)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+
+
+threading.Thread(target=_query_worker, daemon=True).start()
+
+
+def answer_cache_key(question):
+    return (hashlib.sha1(question.encode("utf-8")).hexdigest(), _CORPUS_VERSION)
+
+
+def get_cached_answer(cache_key):
+    with _ANSWER_CACHE_LOCK:
+        return _ANSWER_CACHE.get(cache_key)
+
+
+def cache_answer(cache_key, response):
+    with _ANSWER_CACHE_LOCK:
+        _ANSWER_CACHE[cache_key] = response
+
+
+def build_messages(question, relevant_docs):
+    context = "\n\n".join(doc.page_content for doc in relevant_docs)
+    combined = _PROMPT_TEMPLATE.format(question=question, context=context)
+    return [_SYSTEM_MESSAGE, HumanMessage(content=combined)]
+
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def dedupe_chunks(docs):
+    # Ids hash the source file together with the chunk text, so repeated chunks
+    # within a file are embedded once while each file keeps its own copy of
+    # text it shares with other files (deleting by source stays safe)
+    seen = set()
+    unique_docs = []
+    ids = []
+    for doc in docs:
+        key = doc.metadata["source"] + "\0" + doc.page_content
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        if digest not in seen:
+            seen.add(digest)
+            unique_docs.append(doc)
+            ids.append(digest)
+    return unique_docs, ids
 
 
 def process_documents():
-    supported_files = [
-        f for f in os.listdir(books_dir)
-        if any(f.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
-    ]
+    global _DB, _CORPUS_VERSION
+    supported_files = [entry.name for entry in scan_documents()]
 
     if not supported_files:
         return False
 
-    documents = []
-    for file in supported_files:
-        try:
-            file_path = os.path.join(books_dir, file)
-            file_extension = file.rsplit('.', 1)[1].lower()
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = list(executor.map(_load_one, supported_files))
+    documents = list(itertools.chain.from_iterable(results))
 
-            loader = get_document_loader(file_path, file_extension)
-            file_docs = loader.load()
+    docs, ids = dedupe_chunks(split_documents(documents))
 
-            for doc in file_docs:
-                doc.metadata = {"source": file, "type": file_extension}
-            documents.extend(file_docs)
+    db = create_vector_store(docs, ids)
+    _DB = db
+    _CORPUS_VERSION += 1
+    return True
 
-        except Exception as e:
-            print(f"Error processing {file}: {e}")
-            continue
 
-    text_splitter = CharacterTextSplitter(chunk_size=1024, chunk_overlap=24)
-    docs = text_splitter.split_documents(documents)
+def process_one(filename):
+    global _DB, _CORPUS_VERSION
+    docs, ids = dedupe_chunks(split_documents(load_document(filename)))
+    if not docs:
+        return False
 
-    embeddings = get_embeddings()
-    db = Chroma.from_documents(
-        docs,
-        embeddings,
-        persist_directory=persistent_directory,
-        client_settings=chroma_settings()
-    )
-    db.persist()
+    db = get_vector_store()
+    if db is None:
+        db = create_vector_store(docs, ids)
+    else:
+        # Drop the previous version of this file before adding the new chunks
+        delete_source(db, filename)
+        db.add_documents(docs, ids=ids)
+    _DB = db
+    _CORPUS_VERSION += 1
     return True
 
 
+def _index_worker():
+    while True:
+        filename = _JOBS.get()
+        _JOB_STATUS[filename] = {"status": "processing"}
+        try:
+            processed = process_one(filename)
+            _JOB_STATUS[filename] = {"status": "done", "processed": processed}
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            _JOB_STATUS[filename] = {"status": "failed", "error": str(e)}
+        finally:
+            _JOBS.task_done()
+
+
+threading.Thread(target=_index_worker, daemon=True).start()
+
+
 # ----------------------- ROUTES -----------------------
 @app.route('/')
 def index():
@@ -122,12 +444,11 @@ def list_documents():
     try:
         files = [
             {
-                "filename": f,
-                "type": f.rsplit('.', 1)[1].lower(),
-                "size_mb": round(os.path.getsize(os.path.join(books_dir, f)) / (1024 * 1024), 2)
+                "filename": entry.name,
+                "type": entry.name.rsplit('.', 1)[1].lower(),
+                "size_mb": round(entry.stat().st_size / (1024 * 1024), 2)
             }
-            for f in os.listdir(books_dir)
-            if any(f.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
+            for entry in scan_documents()
         ]
 
         return jsonify({"documents": files, "count": len(files)})
@@ -146,22 +467,36 @@ def upload_document():
         if not allowed_file(file.filename):
             return jsonify({"error": "Invalid file type"}), 400
 
+        file_extension = file.filename.rsplit('.', 1)[1].lower()
+        max_size = MAX_FILE_SIZES[file_extension]
+        too_large = {
+            "error": f"File too large. Maximum size for .{file_extension} files is {max_size // (1024 * 1024)} MB"
+        }
+        if request.content_length and request.content_length > max_size:
+            return jsonify(too_large), 413
+
         filename = secure_filename(file.filename)
         file_path = os.path.join(books_dir, filename)
-        file.save(file_path)
+        if not save_upload(file.stream, file_path, max_size):
+            return jsonify(too_large), 413
 
-        success = process_documents()
+        _JOB_STATUS[filename] = {"status": "queued"}
+        _JOBS.put(filename)
 
         return jsonify({
-            "message": "File uploaded",
-            "processed": success,
+            "message": "File uploaded and queued for processing",
             "filename": filename
-        })
+        }), 202
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({"jobs": dict(_JOB_STATUS), "pending": _JOBS.qsize()})
+
+
 @app.route('/api/ask', methods=['POST'])
 def ask_question():
     try:
@@ -171,31 +506,80 @@ def ask_question():
         if not question:
             return jsonify({"error": "Question is required"}), 400
 
+        cache_key = answer_cache_key(question)
+        cached = get_cached_answer(cache_key)
+        if cached is not None:
+            return jsonify(cached)
+
         db = get_vector_store()
         if not db:
             return jsonify({"error": "Vector store empty. Upload documents first."}), 404
 
-        retriever = db.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-        relevant_docs = retriever.invoke(question)
+        relevant_docs = retrieve_documents(question)
 
-        combined = (
-            question + "\n\nRelevant Docs:\n" +
-            "\n\n".join([doc.page_content for doc in relevant_docs]) +
-            "\n\nAnswer only using the above data. If unsure, say 'I'm not sure'."
-        )
-
-        model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", convert_system_message_to_human=True)
-
-        result = model.invoke([
-            SystemMessage(content="You answer strictly from the provided documents."),
-            HumanMessage(content=combined)
-        ])
+        result = get_llm().invoke(build_messages(question, relevant_docs))
 
-        return jsonify({
+        response = {
             "question": question,
             "answer": result.content,
             "sources": [doc.metadata.get("source") for doc in relevant_docs]
-        })
+        }
+        cache_answer(cache_key, response)
+
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/ask/stream', methods=['POST'])
+def ask_question_stream():
+    try:
+        data = request.get_json()
+        question = data.get("question")
+
+        if not question:
+            return jsonify({"error": "Question is required"}), 400
+
+        cache_key = answer_cache_key(question)
+        cached = get_cached_answer(cache_key)
+
+        if cached is None:
+            db = get_vector_store()
+            if not db:
+                return jsonify({"error": "Vector store empty. Upload documents first."}), 404
+
+            relevant_docs = retrieve_documents(question)
+
+        def generate():
+            if cached is not None:
+                yield sse_event({"chunk": cached["answer"]})
+                yield sse_event({"done": True, "sources": cached["sources"]})
+                return
+
+            sources = [doc.metadata.get("source") for doc in relevant_docs]
+            try:
+                parts = []
+                for chunk in get_llm().stream(build_messages(question, relevant_docs)):
+                    parts.append(chunk.content)
+                    yield sse_event({"chunk": chunk.content})
+
+                cache_answer(cache_key, {
+                    "question": question,
+                    "answer": "".join(parts),
+                    "sources": sources
+                })
+                yield sse_event({"done": True, "sources": sources})
+
+            except Exception as e:
+                yield sse_event({"error": str(e)})
+
+        # Tell reverse proxies (e.g. nginx) not to buffer the event stream
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -205,9 +589,10 @@ def ask_question():
 def health():
     return jsonify({
         "status": "ok",
-        "vector_store": "available" if get_vector_store() else "empty",
+        "vector_store": "available" if os.path.exists(index_directory) else "empty",
+        "index_backend": INDEX_BACKEND,
         "docs_dir": books_dir,
-        "db_dir": persistent_directory
+        "db_dir": index_directory
     })
 
 
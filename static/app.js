@@ -5,6 +5,9 @@ class RAGChatApp {
         this.apiBase = '/api';
         this.chatHistory = [];
         this.isProcessing = false;
+        this.jobPollInterval = 1000;
+        this.maxJobPolls = 600;        // give up on indexing after ~10 minutes
+        this.maxMissingJobPolls = 5;   // job unknown to the server (e.g. restarted)
         this.init();
     }
 
@@ -126,20 +129,26 @@ class RAGChatApp {
         uploadBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Uploading...';
         
         try {
+            const queued = [];
             for (const file of files) {
                 if (!this.isValidFileType(file)) {
                     this.showNotification(`Invalid file type: ${file.name}. Supported: PDF, DOC, DOCX, TXT`, 'error');
                     continue;
                 }
                 
-                await this.uploadSingleFile(file);
+                const result = await this.uploadSingleFile(file);
+                queued.push(result.filename);
             }
             
             // Reload documents list
             await this.loadDocuments();
             
+            // Wait for the server to finish indexing the uploads
+            uploadBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processing...';
+            const processed = await this.waitForJobs(queued);
+            
             // Add system message about new documents
-            this.addMessage('assistant', `I've processed ${files.length} new document(s). You can now ask me questions about them!`);
+            this.addMessage('assistant', `I've processed ${processed} new document(s). You can now ask me questions about them!`);
             
         } catch (error) {
             console.error('Upload error:', error);
@@ -150,6 +159,51 @@ class RAGChatApp {
         }
     }
 
+    async waitForJobs(filenames) {
+        const pending = new Set(filenames);
+        const missing = {};
+        let processed = 0;
+        
+        for (let poll = 0; poll < this.maxJobPolls && pending.size > 0; poll++) {
+            await new Promise(resolve => setTimeout(resolve, this.jobPollInterval));
+            
+            const response = await fetch(`${this.apiBase}/jobs`);
+            if (!response.ok) continue;
+            const data = await response.json();
+            
+            for (const filename of [...pending]) {
+                const job = data.jobs[filename];
+                
+                if (!job) {
+                    missing[filename] = (missing[filename] || 0) + 1;
+                    if (missing[filename] >= this.maxMissingJobPolls) {
+                        pending.delete(filename);
+                        this.showNotification(`Lost track of processing for ${filename}`, 'error');
+                    }
+                    continue;
+                }
+                
+                missing[filename] = 0;
+                if (job.status === 'queued' || job.status === 'processing') continue;
+                
+                pending.delete(filename);
+                if (job.status === 'done' && job.processed) {
+                    processed++;
+                } else if (job.status === 'done') {
+                    this.showNotification(`No text could be extracted from ${filename}`, 'error');
+                } else {
+                    this.showNotification(`Error processing ${filename}: ${job.error}`, 'error');
+                }
+            }
+        }
+        
+        for (const filename of pending) {
+            this.showNotification(`Timed out waiting for ${filename} to be processed`, 'error');
+        }
+        
+        return processed;
+    }
+
     isValidFileType(file) {
         const allowedTypes = ['.pdf', '.doc', '.docx', '.txt'];
         const fileName = file.name.toLowerCase();
@@ -193,7 +247,7 @@ class RAGChatApp {
         this.isProcessing = true;
         
         try {
-            const response = await fetch(`${this.apiBase}/ask`, {
+            const response = await fetch(`${this.apiBase}/ask/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -206,10 +260,10 @@ class RAGChatApp {
                 throw new Error(error.error || 'Failed to get response');
             }
             
-            const data = await response.json();
+            const data = await this.readAnswerStream(response);
             
-            // Remove typing indicator
-            this.removeTypingIndicator();
+            // Replace the streamed preview with the final message
+            this.removeStreamingMessage();
             
             // Add AI response
             this.addMessage('assistant', data.answer, data.sources);
@@ -217,12 +271,79 @@ class RAGChatApp {
         } catch (error) {
             console.error('Error sending message:', error);
             this.removeTypingIndicator();
+            this.removeStreamingMessage();
             this.addMessage('assistant', `Sorry, I encountered an error: ${error.message}`, []);
         } finally {
             this.isProcessing = false;
         }
     }
 
+    async readAnswerStream(response) {
+        // Server-sent events: {chunk}, then {done, sources} or {error}
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            
+            for (const event of events) {
+                if (!event.startsWith('data: ')) continue;
+                const payload = JSON.parse(event.slice(6));
+                
+                if (payload.error) {
+                    throw new Error(payload.error);
+                }
+                if (payload.done) {
+                    return { answer, sources: payload.sources || [] };
+                }
+                
+                answer += payload.chunk;
+                this.updateStreamingMessage(answer);
+            }
+        }
+        
+        return { answer, sources: [] };
+    }
+
+    updateStreamingMessage(content) {
+        const chatMessages = document.getElementById('chat-messages');
+        let messageDiv = document.getElementById('streaming-message');
+        
+        if (!messageDiv) {
+            this.removeTypingIndicator();
+            messageDiv = document.createElement('div');
+            messageDiv.className = 'message assistant';
+            messageDiv.id = 'streaming-message';
+            messageDiv.innerHTML = `
+                <div class="message-avatar">
+                    <i class="fas fa-robot"></i>
+                </div>
+                <div class="message-content">
+                    <div class="message-text"></div>
+                </div>
+            `;
+            chatMessages.appendChild(messageDiv);
+        }
+        
+        messageDiv.querySelector('.message-text').textContent = content;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
+
+    removeStreamingMessage() {
+        this.removeTypingIndicator();
+        const streamingMessage = document.getElementById('streaming-message');
+        if (streamingMessage) {
+            streamingMessage.remove();
+        }
+    }
+
     addMessage(sender, content, sources = []) {
         const chatMessages = document.getElementById('chat-messages');
         const messageDiv = document.createElement('div');
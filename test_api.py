@@ -26,6 +26,17 @@ def test_list_documents():
         print(f"Error: {e}")
     print()
 
+def test_list_jobs():
+    """Test the processing jobs endpoint"""
+    print("=== Testing List Jobs ===")
+    try:
+        response = requests.get(f"{BASE_URL}/jobs")
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {json.dumps(response.json(), indent=2)}")
+    except Exception as e:
+        print(f"Error: {e}")
+    print()
+
 def test_ask_question(question):
     """Test the ask question endpoint"""
     print(f"=== Testing Ask Question: '{question}' ===")
@@ -38,6 +49,20 @@ def test_ask_question(question):
         print(f"Error: {e}")
     print()
 
+def test_ask_question_stream(question):
+    """Test the streaming ask question endpoint"""
+    print(f"=== Testing Ask Question (stream): '{question}' ===")
+    try:
+        data = {"question": question}
+        response = requests.post(f"{BASE_URL}/ask/stream", json=data, stream=True)
+        print(f"Status Code: {response.status_code}")
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("data: "):
+                print(f"Event: {line[6:]}")
+    except Exception as e:
+        print(f"Error: {e}")
+    print()
+
 def test_upload_document(file_path):
     """Test the upload document endpoint"""
     print(f"=== Testing Upload Document: {file_path} ===")
@@ -61,8 +86,12 @@ if __name__ == "__main__":
     # Test list documents
     test_list_documents()
     
+    # Test processing jobs
+    test_list_jobs()
+    
     # Test ask question (only if vector store exists)
     test_ask_question("What is the main theme of the story?")
+    test_ask_question_stream("What is the main theme of the story?")
     
     # Uncomment the line below to test document upload
     # test_upload_document("path/to/your/document.txt")
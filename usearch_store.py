@@ -0,0 +1,115 @@
+"""Vector store backed by a usearch HNSW index and a sqlite chunk table.
+
+Used instead of Chroma when INDEX_BACKEND=usearch. Vectors live in a single
+usearch file stored as f16 (or i8, quantized by usearch from the normalized
+float vectors); chunk text and metadata live in sqlite under the same integer
+key that identifies the vector in the index.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+
+class UsearchStore:
+    def __init__(self, directory, embedding, ndim=384, dtype="f16"):
+        from usearch.index import Index
+
+        os.makedirs(directory, exist_ok=True)
+        self.embedding = embedding
+        self.index_path = os.path.join(directory, "index.usearch")
+        self.index = Index(
+            ndim=ndim,
+            metric="cos",
+            dtype=dtype,
+            connectivity=16,
+            expansion_add=64,
+            expansion_search=64
+        )
+        if os.path.exists(self.index_path):
+            self.index.load(self.index_path)
+
+        self.conn = sqlite3.connect(os.path.join(directory, "chunks.sqlite3"), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "key INTEGER PRIMARY KEY AUTOINCREMENT, chunk_id TEXT UNIQUE, "
+            "source TEXT, page_content TEXT, metadata TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source)")
+        self.lock = threading.Lock()
+
+    def add_documents(self, documents, ids):
+        # Chunks whose id is already stored are skipped rather than re-embedded
+        # (Chroma's wrapper upserts instead); ids are scoped to their source file
+        with self.lock:
+            new = [
+                (doc, chunk_id) for doc, chunk_id in zip(documents, ids)
+                if self.conn.execute("SELECT 1 FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone() is None
+            ]
+        if not new:
+            return []
+
+        vectors = np.asarray(
+            self.embedding.embed_documents([doc.page_content for doc, _ in new]), dtype=np.float32
+        )
+
+        with self.lock, self.conn:
+            keys = [
+                self.conn.execute(
+                    "INSERT INTO chunks (chunk_id, source, page_content, metadata) VALUES (?, ?, ?, ?)",
+                    (chunk_id, doc.metadata.get("source"), doc.page_content, json.dumps(doc.metadata))
+                ).lastrowid
+                for doc, chunk_id in new
+            ]
+            self.index.add(np.asarray(keys, dtype=np.uint64), vectors)
+            self.index.save(self.index_path)
+        return [chunk_id for _, chunk_id in new]
+
+    def delete_source(self, source):
+        with self.lock, self.conn:
+            keys = [row[0] for row in self.conn.execute("SELECT key FROM chunks WHERE source = ?", (source,))]
+            if not keys:
+                return
+            self.index.remove(np.asarray(keys, dtype=np.uint64))
+            self.conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self.index.save(self.index_path)
+
+    def query(self, query_embeddings, n_results):
+        """Return the nearest chunks in the same shape as Chroma's collection.query."""
+        from usearch.index import BatchMatches
+
+        vectors = np.asarray(query_embeddings, dtype=np.float32)
+        results = {"documents": [], "metadatas": [], "embeddings": []}
+
+        with self.lock:
+            if len(self.index) == 0:
+                for key in results:
+                    results[key] = [[] for _ in range(len(vectors))]
+                return results
+
+            matches = self.index.search(vectors, n_results)
+            if isinstance(matches, BatchMatches):
+                matches = [matches[i] for i in range(len(matches))]
+            else:
+                matches = [matches]
+
+            for match in matches:
+                keys = [int(key) for key in match.keys]
+                rows = {
+                    key: (page_content, metadata)
+                    for key, page_content, metadata in self.conn.execute(
+                        f"SELECT key, page_content, metadata FROM chunks WHERE key IN ({','.join('?' * len(keys))})",
+                        keys
+                    )
+                } if keys else {}
+                keys = [key for key in keys if key in rows]
+
+                results["documents"].append([rows[key][0] for key in keys])
+                results["metadatas"].append([json.loads(rows[key][1]) for key in keys])
+                results["embeddings"].append(
+                    np.asarray(self.index.get(np.asarray(keys, dtype=np.uint64)), dtype=np.float32).tolist()
+                    if keys else []
+                )
+        return results
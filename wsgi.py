@@ -0,0 +1,19 @@
+"""WSGI entry point for running the app under gunicorn.
+
+    gunicorn -w 1 -k gthread --threads 8 wsgi:app
+
+Use a single worker: each process keeps its own vector store handle and
+indexing queue, and several processes writing to db/ corrupt the index.
+Threads overlap the I/O-bound Gemini calls, and real threads (unlike gevent
+greenlets) keep CPU-bound indexing from stalling other requests.
+
+Set RUN_INIT=1 to build the vector store from Docs/ at startup.
+"""
+import os
+
+from app import app, books_dir, process_documents
+
+if os.environ.get("RUN_INIT") and os.listdir(books_dir):
+    print("Initializing vector store...")
+    process_documents()
+    print("Vector store Ready.")